@@ -1,10 +1,10 @@
 from fastapi import APIRouter, HTTPException
 from app.models import QueryRequest, QueryResponse
-from app.core.retrieval import RetrievalService
-from app.services.crag import CRAGService
-from app.services.self_reflective import SelfReflectiveService
-from app.services.llm_service import LLMService
-from app.services.reranking import RerankingService
+from app.core.retrieval import get_retrieval_service
+from app.services.crag import get_crag_service
+from app.services.self_reflective import get_self_reflective_service
+from app.services.llm_service import get_llm_service
+from app.services.reranking import get_reranking_service
 from app.config import get_settings
 from loguru import logger
 import time
@@ -12,11 +12,11 @@ import time
 router = APIRouter(prefix="/query", tags=["query"])
 
 settings = get_settings()
-retrieval_service = RetrievalService()
-crag_service = CRAGService()
-self_reflective_service = SelfReflectiveService()
-llm_service = LLMService()
-reranking_service = RerankingService()
+retrieval_service = get_retrieval_service()
+crag_service = get_crag_service()
+self_reflective_service = get_self_reflective_service()
+llm_service = get_llm_service()
+reranking_service = get_reranking_service()
 
 
 @router.post("/", response_model=QueryResponse)
@@ -35,7 +35,7 @@ async def query_documents(request: QueryRequest):
             initial_top_k = settings.reranker_initial_top_k
 
         # Stage 1: Retrieve (with optional HYDE)
-        retrieved_chunks = retrieval_service.retrieve(
+        retrieved_chunks, hypotheses = await retrieval_service.retrieve(
             query=request.query,
             top_k=initial_top_k,
             use_hyde=request.enable_hyde,
@@ -45,7 +45,7 @@ async def query_documents(request: QueryRequest):
         initial_retrieval_count = len(retrieved_chunks)
 
         if request.enable_hyde:
-            hyde_hypotheses = retrieval_service.get_last_hyde_hypotheses()
+            hyde_hypotheses = hypotheses
 
         if not retrieved_chunks:
             raise HTTPException(
@@ -70,24 +70,29 @@ async def query_documents(request: QueryRequest):
             # Standard RAG
             context = "\n\n".join([chunk.content for chunk in retrieved_chunks])
             prompt = f"Query: {request.query}\n\nContext:\n{context}\n\nAnswer:"
-            answer = llm_service.generate(prompt)
+            answer = await llm_service.generate(prompt)
             
         elif request.mode == "crag":
             # Corrective RAG
-            crag_result = crag_service.execute_crag(request.query, retrieved_chunks)
-            answer = crag_service.generate_answer_with_crag(request.query, crag_result)
+            crag_result = await crag_service.execute_crag(
+                request.query,
+                retrieved_chunks,
+                with_answer=True
+            )
+            answer = await crag_service.generate_answer_with_crag(request.query, crag_result)
             crag_details = crag_result
             
         elif request.mode == "self_reflective":
             # Self-Reflective RAG
-            def retrieval_fn(refined_query):
-                return retrieval_service.retrieve(
+            async def retrieval_fn(refined_query):
+                chunks, _ = await retrieval_service.retrieve(
                     refined_query,
                     request.top_k,
                     search_mode=request.search_mode
                 )
+                return chunks
             
-            sr_result = self_reflective_service.execute_self_reflective(
+            sr_result = await self_reflective_service.execute_self_reflective(
                 request.query,
                 retrieved_chunks,
                 retrieval_fn
@@ -98,29 +103,33 @@ async def query_documents(request: QueryRequest):
             
         elif request.mode == "both":
             # Execute CRAG first (evaluates relevance, triggers web search if needed)
-            crag_result = crag_service.execute_crag(request.query, retrieved_chunks)
+            crag_result = await crag_service.execute_crag(request.query, retrieved_chunks)
 
             # Get augmented chunks (includes web search results if triggered)
             working_chunks = crag_service.get_augmented_chunks(crag_result)
 
-            logger.info(f"Mode=both: Using {len(working_chunks)} chunks for Self-Reflective "
-                       f"({len([c for c in working_chunks if c.metadata.file_type == 'web_search'])} from web search)")
+            # Lazy: the web chunk count is only computed if INFO is emitted
+            logger.opt(lazy=True).info(
+                "Mode=both: Using {total} chunks for Self-Reflective ({web} from web search)",
+                total=lambda: len(working_chunks),
+                web=lambda: sum(c.metadata.file_type == "web_search" for c in working_chunks)
+            )
 
             # CRAG-aware retrieval function: preserves web search if it was triggered
-            def retrieval_fn(refined_query):
+            async def retrieval_fn(refined_query):
                 # Re-retrieve from vector store
-                new_chunks = retrieval_service.retrieve(
+                new_chunks, _ = await retrieval_service.retrieve(
                     refined_query,
                     request.top_k,
                     search_mode=request.search_mode
                 )
                 # Re-run CRAG evaluation on new chunks
-                new_crag_result = crag_service.execute_crag(refined_query, new_chunks)
+                new_crag_result = await crag_service.execute_crag(refined_query, new_chunks)
                 # Return augmented chunks (preserves web search if triggered again)
                 return crag_service.get_augmented_chunks(new_crag_result)
 
             # Execute Self-Reflective RAG with CRAG-augmented context
-            sr_result = self_reflective_service.execute_self_reflective(
+            sr_result = await self_reflective_service.execute_self_reflective(
                 request.query,
                 working_chunks,  # Now includes web search results!
                 retrieval_fn
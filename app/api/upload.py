@@ -1,8 +1,8 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from app.models import UploadResponse
 from app.services.document_processor import DocumentProcessor
-from app.services.vector_store import VectorStore
-from app.services.embedding_service import EmbeddingService
+from app.services.vector_store import get_vector_store
+from app.services.embedding_service import get_embedding_service
 from app.config import get_settings
 from pathlib import Path
 import shutil
@@ -12,8 +12,8 @@ from uuid import uuid4
 router = APIRouter(prefix="/upload", tags=["upload"])
 
 document_processor = DocumentProcessor()
-vector_store = VectorStore()
-embedding_service = EmbeddingService()
+vector_store = get_vector_store()
+embedding_service = get_embedding_service()
 settings = get_settings()
 
 
@@ -54,10 +54,10 @@ async def upload_document(file: UploadFile = File(...)):
         metadatas = document_processor.update_total_chunks(metadatas)
         
         # Generate embeddings
-        embeddings = embedding_service.embed_batch(chunks)
+        embeddings = await embedding_service.embed_batch(chunks)
         
         # Store in vector database
-        chunk_ids = vector_store.upsert_chunks(chunks, embeddings, metadatas)
+        chunk_ids = await vector_store.upsert_chunks(chunks, embeddings, metadatas)
         
         logger.info(f"Successfully processed {len(chunks)} chunks")
         
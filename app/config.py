@@ -10,6 +10,9 @@ class Settings(BaseSettings):
     openai_api_key: str
     tavily_api_key: str
     
+    # Outbound HTTP (shared pool for OpenAI and Tavily)
+    http_timeout: float = 30.0  # seconds
+
     # Qdrant
     qdrant_url: str = "http://localhost:6333"
     qdrant_api_key: str | None = None
@@ -23,7 +26,29 @@ class Settings(BaseSettings):
     # CRAG Settings
     crag_relevance_threshold: float = 0.7
     crag_ambiguous_threshold: float = 0.5
+    crag_evaluation_method: Literal["llm_grader", "embedding_grader", "logprob_grader"] = "llm_grader"
+    # Cosine similarity bands for the embedding grader (cosine scores sit lower than LLM grades)
+    crag_embedding_relevance_threshold: float = 0.5
+    crag_embedding_ambiguous_threshold: float = 0.3
+    crag_grader_max_tokens: int = 800  # prompt token budget for the relevance grader
+    # Grade, web search and answer in one Responses API call (CRAG mode only)
+    crag_single_pass_enabled: bool = False
     
+    # CRAG Batch Grading (coalesce concurrent grader calls). Replaces the fused
+    # grade + answer call in CRAG mode, so the answer is generated separately.
+    crag_batch_grading_enabled: bool = False
+    crag_batch_max_size: int = 8
+    crag_batch_window_ms: int = 50
+
+    # CRAG Batch API (offline jobs at reduced cost, results within 24h)
+    crag_batch_mode: bool = False
+
+    # CRAG Response Cache
+    crag_cache_enabled: bool = True
+    crag_cache_ttl: int = 86400  # seconds
+    crag_cache_max_entries: int = 1024  # in-process LRU size
+    redis_url: str | None = None  # optional shared cache tier
+
     # Self-Reflective Settings
     reflection_min_score: float = 0.8
     max_reflection_retries: int = 2
@@ -1,26 +1,37 @@
-from app.services.vector_store import VectorStore
-from app.services.embedding_service import EmbeddingService
-from app.services.hyde import HydeService
+from app.services.vector_store import get_vector_store
+from app.services.embedding_service import get_embedding_service
+from app.services.hyde import get_hyde_service
 from app.models import RetrievedChunk, ChunkMetadata
 from app.config import get_settings
+from functools import lru_cache
+from datetime import datetime
 from loguru import logger
+import asyncio
+
+
+def _parse_timestamp(value):
+    """Parse ISO timestamps stored in Qdrant payloads"""
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
 
 
 class RetrievalService:
     def __init__(self):
         self.settings = get_settings()
-        self.vector_store = VectorStore()
-        self.embedding_service = EmbeddingService()
-        self.hyde_service = HydeService()
-        self._last_hyde_hypotheses = None  # For metadata tracking
+        self.vector_store = get_vector_store()
+        self.embedding_service = get_embedding_service()
+        self.hyde_service = get_hyde_service()
+        # Read per request; resolved once here instead
+        self.top_k = self.settings.top_k_results
+        # Chunk similarities are only needed by the embedding-based CRAG grader
+        self.with_similarity = self.settings.crag_evaluation_method == "embedding_grader"
     
-    def retrieve(
+    async def retrieve(
         self,
         query: str,
         top_k: int = None,
         use_hyde: bool = False,
         search_mode: str = "hybrid"
-    ) -> list[RetrievedChunk]:
+    ) -> tuple[list[RetrievedChunk], list[str] | None]:
         """
         Retrieve relevant chunks for query with optional HYDE enhancement.
 
@@ -31,63 +42,139 @@ class RetrievalService:
             search_mode: Search mode - "dense", "sparse", or "hybrid"
 
         Returns:
-            List of retrieved chunks
+            Tuple of (retrieved chunks, HYDE hypotheses or None when HYDE
+            is not used). Hypotheses are returned rather than stored on the
+            shared service so concurrent requests cannot see each other's.
         """
 
         if top_k is None:
-            top_k = self.settings.top_k_results
+            top_k = self.top_k
 
+        hypotheses = None
         if use_hyde:
             # Generate hypothetical documents
-            hypotheses = self.hyde_service.generate_hypothetical_documents(query)
-            self._last_hyde_hypotheses = hypotheses
-
-            # Batch embed all hypotheses
-            hypothesis_vectors = self.embedding_service.embed_batch(hypotheses)
+            hypotheses = await self.hyde_service.generate_hypothetical_documents(query)
+
+            # Batch embed all hypotheses. The embedding grader's thresholds are
+            # tuned for query-chunk similarity, so the query is embedded in the
+            # same call and similarities are measured against it.
+            if self.with_similarity:
+                query_vector, *hypothesis_vectors = await self.embedding_service.embed_batch(
+                    [query, *hypotheses]
+                )
+            else:
+                query_vector = None
+                hypothesis_vectors = await self.embedding_service.embed_batch(hypotheses)
 
             # Run parallel searches for each hypothesis
-            all_results = []
-            for hypothesis, vector in zip(hypotheses, hypothesis_vectors):
-                results = self.vector_store.search(
-                    query_vector=vector,
-                    query_text=hypothesis,
-                    top_k=top_k,
-                    mode=search_mode
-                )
-                all_results.extend(results)
+            result_lists = await self._search_many(
+                hypotheses, hypothesis_vectors, top_k, search_mode, query_vector
+            )
+            all_results = [result for results in result_lists for result in results]
 
             # Merge and deduplicate results
             retrieved_chunks = self._merge_and_deduplicate(all_results, top_k)
             logger.info(
-                f"HYDE: Retrieved {len(retrieved_chunks)} unique chunks "
-                f"from {len(hypotheses)} hypotheses"
+                "HYDE: Retrieved {} unique chunks from {} hypotheses",
+                len(retrieved_chunks),
+                len(hypotheses)
             )
         else:
             # Standard retrieval pathway
-            query_vector = self.embedding_service.embed_text(query)
+            query_vector = await self.embedding_service.embed_text(query)
 
             # Search vector store
-            results = self.vector_store.search(
+            results = await self.vector_store.search(
                 query_vector=query_vector,
                 query_text=query,
                 top_k=top_k,
-                mode=search_mode
+                mode=search_mode,
+                with_similarity=self.with_similarity
             )
 
             # Convert to RetrievedChunk models
             retrieved_chunks = self._convert_to_chunks(results)
-            logger.info(f"Retrieved {len(retrieved_chunks)} chunks for query (mode: {search_mode})")
+            logger.info("Retrieved {} chunks for query (mode: {})", len(retrieved_chunks), search_mode)
+
+        return retrieved_chunks, hypotheses
+
+    async def retrieve_many(
+        self,
+        queries: list[str],
+        top_k: int = None,
+        search_mode: str = "hybrid"
+    ) -> list[list[RetrievedChunk]]:
+        """
+        Retrieve chunks for several queries at once.
+
+        All queries are embedded in one batch request and their vector
+        searches run concurrently.
+
+        Args:
+            queries: Queries to retrieve for
+            top_k: Number of chunks to retrieve per query
+            search_mode: Search mode - "dense", "sparse", or "hybrid"
+
+        Returns:
+            One list of retrieved chunks per query, in input order
+        """
+        if not queries:
+            return []
+
+        if top_k is None:
+            top_k = self.top_k
+
+        query_vectors = await self.embedding_service.embed_batch(queries)
+        result_lists = await self._search_many(
+            queries, query_vectors, top_k, search_mode
+        )
 
-        return retrieved_chunks
+        logger.info("Retrieved chunks for {} queries (mode: {})", len(queries), search_mode)
+        return [self._convert_to_chunks(results) for results in result_lists]
+
+    async def _search_many(
+        self,
+        texts: list[str],
+        vectors: list[list[float]],
+        top_k: int,
+        search_mode: str,
+        similarity_vector: list[float] | None = None
+    ) -> list[list[dict]]:
+        """
+        Run one vector store search per (text, vector) pair concurrently.
+
+        Chunk similarities are measured against similarity_vector when given,
+        otherwise against each search vector.
+        """
+        return await asyncio.gather(*(
+            self.vector_store.search(
+                query_vector=vector,
+                query_text=text,
+                top_k=top_k,
+                mode=search_mode,
+                with_similarity=self.with_similarity,
+                similarity_vector=similarity_vector
+            )
+            for text, vector in zip(texts, vectors)
+        ))
 
     def _convert_to_chunks(self, results: list[dict]) -> list[RetrievedChunk]:
         """Convert vector store results to RetrievedChunk models"""
+        # Qdrant payloads are trusted: they were built by DocumentProcessor at
+        # ingest, so skip Pydantic validation. Timestamps are stored as ISO
+        # strings and are the only fields that need converting.
         chunks = []
         for result in results:
-            chunk = RetrievedChunk(
+            metadata = result["metadata"]
+            chunk = RetrievedChunk.model_construct(
                 content=result["content"],
-                metadata=ChunkMetadata(**result["metadata"]),
-                score=result["score"]
+                metadata=ChunkMetadata.model_construct(**{
+                    **metadata,
+                    "created_at": _parse_timestamp(metadata.get("created_at")),
+                    "processed_at": _parse_timestamp(metadata.get("processed_at"))
+                }),
+                score=result["score"],
+                similarity=result.get("similarity")
             )
             chunks.append(chunk)
         return chunks
@@ -131,6 +218,7 @@ class RetrievalService:
         # Return top_k
         return sorted_chunks[:top_k]
 
-    def get_last_hyde_hypotheses(self) -> list[str] | None:
-        """Return hypotheses from last HYDE retrieval for response metadata"""
-        return self._last_hyde_hypotheses
+
+@lru_cache
+def get_retrieval_service() -> RetrievalService:
+    return RetrievalService()
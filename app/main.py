@@ -2,6 +2,9 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import upload, query
 from app.config import get_settings
+from app.services.crag import get_crag_service
+from app.services.http_client import close_http_client
+from contextlib import asynccontextmanager
 from loguru import logger
 import sys
 
@@ -15,10 +18,20 @@ logger.add(
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Stop the batch grader worker, then release the pooled outbound connections
+    await get_crag_service().aclose()
+    await close_http_client()
+
+
 app = FastAPI(
     title="Corrective RAG + Self-Reflective RAG",
     description="Minimal implementation showcasing CRAG and Self-Reflective RAG patterns",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS
@@ -53,6 +66,24 @@ async def health():
     return {"status": "healthy"}
 
 
-if __name__ == "__main__":
+def main():
+    """Serve the API on uvloop with the httptools HTTP parser when installed"""
     import uvicorn
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
+    # uvicorn[standard] skips uvloop on Windows; "auto" falls back to asyncio
+    try:
+        import uvloop  # noqa: F401
+        import httptools  # noqa: F401
+        loop, http = "uvloop", "httptools"
+    except ImportError:
+        loop, http = "auto", "auto"
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop=loop,
+        http=http
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -59,6 +59,7 @@ class RetrievedChunk(BaseModel):
     content: str
     metadata: ChunkMetadata
     score: float
+    similarity: Optional[float] = None  # Dense cosine similarity to the query vector
 
 
 # ============= CRAG Models =============
@@ -77,6 +78,20 @@ class CRAGResult(BaseModel):
     evaluation: CRAGEvaluation
     retrieved_chunks: list[RetrievedChunk]
     web_results: Optional[list[dict]] = None
+    # Title/url of web sources cited by the single-pass answer (no page content)
+    web_citations: Optional[list[dict]] = None
+    # Answer drafted together with the relevance grade; excluded from responses
+    # since it is surfaced as the top-level answer
+    draft_answer: Optional[str] = Field(default=None, exclude=True)
+    # Formatted retrieved documents, reused when generating the answer
+    cached_context: Optional[str] = Field(default=None, exclude=True)
+
+
+class CRAGJob(BaseModel):
+    """Offline CRAG job for the OpenAI Batch API"""
+    job_id: str
+    query: str
+    retrieved_chunks: list[RetrievedChunk]
 
 
 # ============= Self-Reflective Models =============
@@ -1,125 +1,959 @@
-from app.services.llm_service import LLMService
-from app.services.web_search import WebSearchService
-from app.models import CRAGEvaluation, CRAGResult, RetrievedChunk, ChunkMetadata
+from app.services.llm_service import get_llm_service
+from app.services.web_search import get_web_search_service
+from app.services.response_cache import ResponseCache
+from app.services.relevance_batcher import RelevanceBatcher
+from app.models import CRAGEvaluation, CRAGJob, CRAGResult, RetrievedChunk, ChunkMetadata
 from app.config import get_settings
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Literal
 from loguru import logger
-import json
+import asyncio
+import msgspec
 import tiktoken
 
 
+# Bump when grader/answer prompts change so cached responses are invalidated
+CRAG_PROMPT_VERSION = "3"
+
+# Score bands spelled out for the batch, fused and single-pass prompts; the
+# single-query grader carries them in its one-line GRADER_RUBRIC instead
+SCORING_GUIDE = """Scoring guide:
+- relevant (0.7-1.0): Documents directly answer the query
+- ambiguous (0.4-0.7): Partial information, may need web search
+- irrelevant (0.0-0.4): Documents don't help answer the query
+"""
+
+# Static sections of the single-query relevance grader prompt, built once at import
+GRADER_PROMPT_PREFIX = "Query: "
+
+GRADER_DOCUMENTS_HEADER = "\n\nDocuments:\n"
+
+# The output shape lives in GRADER_SCHEMA, so the rubric is one line
+GRADER_RUBRIC = "\n\nGrade how well the documents answer the query: relevant >=0.7, ambiguous 0.4-0.7, irrelevant <0.4."
+
+GRADER_SYSTEM_PROMPT = "JSON grader."
+
+# Chat format overhead: ~3 tokens per message (system + user) plus 3 priming
+# the assistant reply
+CHAT_FRAMING_TOKENS = 3 * 2 + 3
+
+# Structured output schema for the single-query relevance grader
+GRADER_SCHEMA = {
+    "name": "crag_grade",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "relevance_score": {"type": "number"},
+            "relevance_label": {
+                "type": "string",
+                "enum": ["relevant", "ambiguous", "irrelevant"]
+            },
+            "confidence": {"type": "number"}
+        },
+        "required": ["relevance_score", "relevance_label", "confidence"],
+        "additionalProperties": False
+    }
+}
+
+# Structured output schema for the micro-batched relevance grader
+BATCH_GRADER_SCHEMA = {
+    "name": "crag_batch_grades",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "grades": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "integer"},
+                        **GRADER_SCHEMA["schema"]["properties"]
+                    },
+                    "required": ["id", *GRADER_SCHEMA["schema"]["required"]],
+                    "additionalProperties": False
+                }
+            }
+        },
+        "required": ["grades"],
+        "additionalProperties": False
+    }
+}
+
+ANSWER_SYSTEM_PROMPT = "Answer from context."
+
+EVALUATE_AND_ANSWER_SYSTEM_PROMPT = "You are a relevance evaluator and question answering assistant for RAG systems."
+
+# Structured output schema for the fused grade + answer call
+EVALUATE_AND_ANSWER_SCHEMA = {
+    "name": "crag_evaluation",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "relevance_score": {"type": "number"},
+            "relevance_label": {
+                "type": "string",
+                "enum": ["relevant", "ambiguous", "irrelevant"]
+            },
+            "confidence": {"type": "number"},
+            "answer": {"type": "string"}
+        },
+        "required": ["relevance_score", "relevance_label", "confidence", "answer"],
+        "additionalProperties": False
+    }
+}
+
+
+@lru_cache
+def _get_encoding(model: str) -> tiktoken.Encoding:
+    """Tokenizer for the LLM model, used to budget grader context"""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+# Typed mirrors of the grader responses: msgspec parses and validates in one
+# pass, so the evaluation can be built without re-validating through Pydantic
+class _GraderResponse(msgspec.Struct):
+    relevance_score: float = 0.5
+    relevance_label: Literal["relevant", "ambiguous", "irrelevant"] = "ambiguous"
+    confidence: float = 0.7
+
+
+class _EvaluateAndAnswerResponse(msgspec.Struct):
+    relevance_score: float
+    relevance_label: Literal["relevant", "ambiguous", "irrelevant"]
+    confidence: float
+    answer: str
+
+
+class _BatchGrade(msgspec.Struct):
+    id: int
+    relevance_score: float = 0.5
+    relevance_label: Literal["relevant", "ambiguous", "irrelevant"] = "ambiguous"
+    confidence: float = 0.7
+
+
+class _BatchGrades(msgspec.Struct):
+    grades: list[_BatchGrade]
+
+
 class CRAGService:
     def __init__(self):
         self.settings = get_settings()
-        self.llm = LLMService()
-        self.web_search = WebSearchService()
+        self.llm = get_llm_service()
+        self.web_search = get_web_search_service()
+        self.cache = ResponseCache()
+        # Hot-path settings, resolved once per service
+        self.model = self.settings.llm_model
+        self.evaluation_method = self.settings.crag_evaluation_method
+        self.ambiguous_threshold = self.settings.crag_ambiguous_threshold
+        self.embedding_relevance_threshold = self.settings.crag_embedding_relevance_threshold
+        self.embedding_ambiguous_threshold = self.settings.crag_embedding_ambiguous_threshold
+        self.grader_max_tokens = self.settings.crag_grader_max_tokens
+        self.single_pass_enabled = self.settings.crag_single_pass_enabled
+        self.encoding = _get_encoding(self.model)
+        # Tokens used by the grader request around the query and chunks: system
+        # prompt, static prompt sections and chat message framing
+        self._grader_overhead_tokens = (
+            len(self.encoding.encode(GRADER_SYSTEM_PROMPT))
+            + len(self.encoding.encode(
+                GRADER_PROMPT_PREFIX + GRADER_DOCUMENTS_HEADER + GRADER_RUBRIC
+            ))
+            + CHAT_FRAMING_TOKENS
+        )
+        self._chunk_separator_tokens = len(self.encoding.encode("\n\n"))
+        self.batcher = None
+        if self.settings.crag_batch_grading_enabled:
+            self.batcher = RelevanceBatcher(
+                self._evaluate_batch_by_llm,
+                max_batch_size=self.settings.crag_batch_max_size,
+                window_ms=self.settings.crag_batch_window_ms
+            )
+    
+    async def aclose(self) -> None:
+        """Stop background work (the batch grader worker) on shutdown"""
+        if self.batcher is not None:
+            await self.batcher.aclose()
     
-    def evaluate_relevance(
+    async def evaluate_relevance(
         self,
         query: str,
         retrieved_chunks: list[RetrievedChunk]
     ) -> CRAGEvaluation:
         """Evaluate if retrieved chunks are relevant to query"""
         
-        # Prepare context from chunks
-        context = "\n\n".join([
-            f"Chunk {i+1}: {chunk.content[:300]}"
-            for i, chunk in enumerate(retrieved_chunks)
+        method = self.evaluation_method
+        cache_key = self._cache_key("grader", query, retrieved_chunks, method)
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            return CRAGEvaluation(**cached)
+        
+        try:
+            evaluation = None
+            if method == "embedding_grader":
+                evaluation = self._evaluate_by_similarity(retrieved_chunks)
+                if evaluation is None:
+                    logger.warning("CRAG: No chunk similarities available, falling back to LLM grader")
+            elif method == "logprob_grader":
+                evaluation = await self._evaluate_by_logprobs(query, retrieved_chunks)
+            
+            if evaluation is None and self.batcher is not None:
+                evaluation = await self.batcher.evaluate(query, retrieved_chunks)
+            elif evaluation is None:
+                evaluation = await self._evaluate_by_llm(query, retrieved_chunks)
+        except Exception as e:
+            logger.error(f"Relevance evaluation error: {e}")
+            # Default to safe fallback; not cached so the next call retries
+            return self._fallback_evaluation(method)
+        
+        await self.cache.set(cache_key, evaluation.model_dump())
+        return evaluation
+    
+    async def _evaluate_by_llm(
+        self,
+        query: str,
+        retrieved_chunks: list[RetrievedChunk]
+    ) -> CRAGEvaluation:
+        """Grade relevance with a JSON LLM grader"""
+        
+        # Static prompt sections are module constants; only the query and
+        # chunk slices are spliced in, with a single join
+        parts = [GRADER_PROMPT_PREFIX, query, GRADER_DOCUMENTS_HEADER]
+        parts.extend(self._grader_context_parts(query, retrieved_chunks))
+        parts.append(GRADER_RUBRIC)
+        prompt = "".join(parts)
+        
+        # Structured outputs enforce the fixed-shape JSON object
+        response = await self.llm.generate_with_json(
+            prompt,
+            GRADER_SYSTEM_PROMPT,
+            max_tokens=80,
+            json_schema=GRADER_SCHEMA
+        )
+        parsed = msgspec.json.decode(response, type=_GraderResponse)
+        
+        return self._build_evaluation(
+            relevance_score=parsed.relevance_score,
+            relevance_label=parsed.relevance_label,
+            confidence=parsed.confidence
+        )
+    
+    async def evaluate_relevance_batch(
+        self,
+        queries_with_chunks: list[tuple[str, list[RetrievedChunk]]]
+    ) -> list[CRAGEvaluation]:
+        """
+        Evaluate several (query, chunks) pairs with a single LLM grader call.
+
+        Args:
+            queries_with_chunks: Pairs of query and its retrieved chunks
+
+        Returns:
+            One evaluation per pair, in input order. Pairs the grader failed
+            to score get the safe fallback evaluation.
+        """
+        # One timestamp for the whole batch, grades and fallbacks alike
+        now = datetime.now(timezone.utc)
+        try:
+            evaluations = await self._evaluate_batch_by_llm(queries_with_chunks, now)
+        except Exception as e:
+            logger.error(f"Batch relevance evaluation error: {e}")
+            evaluations = [None] * len(queries_with_chunks)
+        
+        return [
+            evaluation if evaluation is not None else self._fallback_evaluation(evaluated_at=now)
+            for evaluation in evaluations
+        ]
+    
+    async def _evaluate_batch_by_llm(
+        self,
+        queries_with_chunks: list[tuple[str, list[RetrievedChunk]]],
+        evaluated_at: datetime | None = None
+    ) -> list[CRAGEvaluation | None]:
+        """
+        Grade a batch of pairs in one JSON LLM call.
+
+        Returns one entry per pair in input order; None where the response
+        has no grade for that pair. Raises if the call or parsing fails.
+        All grades are stamped with evaluated_at, or the time of the call.
+        """
+        
+        pairs = "\n\n".join([
+            f"Pair {i+1}:\nQuery: {query}\n\nRetrieved Documents:\n{self._build_grader_context(query, chunks)}"
+            for i, (query, chunks) in enumerate(queries_with_chunks)
         ])
         
-        prompt = f"""Evaluate if the following retrieved documents are relevant to answer the query.
+        prompt = f"""Evaluate, for each of the following {len(queries_with_chunks)} (query, documents) pairs, if the retrieved documents are relevant to answer the query. Return one grade per pair, with id set to the pair number.
+
+{pairs}
+
+{SCORING_GUIDE}"""
+        
+        # Each grade is a small fixed-shape object, so output is bounded per pair
+        response = await self.llm.generate_with_json(
+            prompt,
+            GRADER_SYSTEM_PROMPT,
+            max_tokens=60 * len(queries_with_chunks),
+            json_schema=BATCH_GRADER_SCHEMA
+        )
+        grades = {
+            grade.id: grade
+            for grade in msgspec.json.decode(response, type=_BatchGrades).grades
+        }
+        
+        now = evaluated_at or datetime.now(timezone.utc)
+        evaluations = []
+        for i in range(len(queries_with_chunks)):
+            grade = grades.get(i + 1)
+            if grade is None:
+                evaluations.append(None)
+                continue
+            evaluations.append(self._build_evaluation(
+                relevance_score=grade.relevance_score,
+                relevance_label=grade.relevance_label,
+                confidence=grade.confidence,
+                evaluated_at=now
+            ))
+        
+        return evaluations
+    
+    def _evaluate_by_similarity(
+        self,
+        retrieved_chunks: list[RetrievedChunk]
+    ) -> CRAGEvaluation | None:
+        """
+        Grade relevance from query-chunk cosine similarity without an LLM call.
+
+        Scores the mean of the top-3 similarities against the embedding grader
+        thresholds. Returns None if no chunk carries a similarity.
+        """
+        similarities = sorted(
+            (chunk.similarity for chunk in retrieved_chunks if chunk.similarity is not None),
+            reverse=True
+        )[:3]
+        if not similarities:
+            return None
+        
+        relevance_threshold = self.embedding_relevance_threshold
+        ambiguous_threshold = self.embedding_ambiguous_threshold
+        
+        def to_label(score: float) -> str:
+            if score >= relevance_threshold:
+                return "relevant"
+            if score >= ambiguous_threshold:
+                return "ambiguous"
+            return "irrelevant"
+        
+        relevance_score = sum(similarities) / len(similarities)
+        relevance_label = to_label(relevance_score)
+        # Confidence: share of top chunks that fall in the same band as the mean
+        confidence = sum(to_label(s) == relevance_label for s in similarities) / len(similarities)
+        
+        # Cosine similarity is a coarser signal than an LLM grade, so any
+        # ambiguous result is backed by web search
+        return self._build_evaluation(
+            relevance_score=relevance_score,
+            relevance_label=relevance_label,
+            confidence=confidence,
+            evaluation_method="embedding_grader",
+            web_search_threshold=relevance_threshold
+        )
+    
+    async def _evaluate_by_logprobs(
+        self,
+        query: str,
+        retrieved_chunks: list[RetrievedChunk]
+    ) -> CRAGEvaluation:
+        """Grade relevance from the logprobs of a single-token R/A/I completion"""
+        
+        context = self._build_grader_context(query, retrieved_chunks)
+        
+        prompt = f"""Are the following retrieved documents relevant to answer the query?
 
 Query: {query}
 
 Retrieved Documents:
 {context}
 
-Provide evaluation as JSON:
-{{
-    "relevance_score": <float 0.0-1.0>,
-    "relevance_label": "<relevant|ambiguous|irrelevant>",
-    "confidence": <float 0.0-1.0>,
-    "reasoning": "<brief explanation>"
-}}
+Reply with one letter: R if they directly answer the query, A if they only partially help, I if they don't help."""
+        
+        system_prompt = "You are a relevance evaluator for RAG systems."
+        
+        probabilities = await self.llm.generate_label_probabilities(
+            prompt,
+            labels=["R", "A", "I"],
+            system_prompt=system_prompt
+        )
+        total = sum(probabilities.values())
+        if total == 0:
+            raise ValueError("no R/A/I token among top logprobs")
+        
+        p_relevant = probabilities["R"] / total
+        p_ambiguous = probabilities["A"] / total
+        p_irrelevant = probabilities["I"] / total
+        
+        labels = {"relevant": p_relevant, "ambiguous": p_ambiguous, "irrelevant": p_irrelevant}
+        relevance_label = max(labels, key=labels.get)
+        
+        return self._build_evaluation(
+            relevance_score=p_relevant + 0.5 * p_ambiguous,
+            relevance_label=relevance_label,
+            confidence=labels[relevance_label],
+            evaluation_method="logprob_grader"
+        )
+    
+    def _build_grader_context(self, query: str, retrieved_chunks: list[RetrievedChunk]) -> str:
+        """Prepare truncated chunk context for relevance grading"""
+        return "".join(self._grader_context_parts(query, retrieved_chunks))
+    
+    def _grader_context_parts(
+        self,
+        query: str,
+        retrieved_chunks: list[RetrievedChunk]
+    ) -> list[str]:
+        """
+        Truncated chunk context as string parts, ready to be joined.
 
-Scoring guide:
-- relevant (0.7-1.0): Documents directly answer the query
-- ambiguous (0.4-0.7): Partial information, may need web search
-- irrelevant (0.0-0.4): Documents don't help answer the query
-"""
+        Each chunk is cut to an equal share of crag_grader_max_tokens left
+        after the prompt overhead, query, chunk labels and separators, with a
+        floor of 32 tokens.
+        """
+        if not retrieved_chunks:
+            return []
         
-        system_prompt = "You are a relevance evaluator for RAG systems. Always respond with valid JSON."
+        labels = [f"Chunk {i}: " for i in range(1, len(retrieved_chunks) + 1)]
+        available = (
+            self.grader_max_tokens
+            - self._grader_overhead_tokens
+            - len(self.encoding.encode(query))
+            - sum(len(self.encoding.encode(label)) for label in labels)
+            - self._chunk_separator_tokens * (len(retrieved_chunks) - 1)
+        )
+        budget = max(32, available // len(retrieved_chunks))
+        
+        parts = []
+        for i, (label, chunk) in enumerate(zip(labels, retrieved_chunks)):
+            if i:
+                parts.append("\n\n")
+            parts.extend((label, self._truncate_tokens(chunk.content, budget)))
+        return parts
+    
+    def _truncate_tokens(self, text: str, max_tokens: int) -> str:
+        """Truncate text to at most max_tokens tokens"""
+        # A token almost always spans under 10 characters, so encoding only
+        # this prefix keeps long chunks cheap. If the prefix comes up short of
+        # the budget (e.g. long runs of whitespace), encode the full text so
+        # the chunk still gets its whole token share.
+        prefix = text[:max_tokens * 10]
+        tokens = self.encoding.encode(prefix)
+        if len(tokens) < max_tokens and len(prefix) < len(text):
+            prefix, tokens = text, self.encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return prefix
+        return self.encoding.decode(tokens[:max_tokens])
+    
+    async def evaluate_and_answer(
+        self,
+        query: str,
+        retrieved_chunks: list[RetrievedChunk],
+        documents_context: str | None = None
+    ) -> tuple[CRAGEvaluation, str | None]:
+        """
+        Evaluate relevance and draft an answer in a single LLM round trip.
+
+        Args:
+            query: User's query
+            retrieved_chunks: Chunks retrieved for the query
+            documents_context: Pre-formatted chunks from _format_documents,
+                built here if not given
+
+        Returns:
+            Tuple of (evaluation, draft answer). The draft is None if the
+            call failed or the model produced no answer.
+        """
+        
+        cache_key = self._cache_key("fused", query, retrieved_chunks)
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            return CRAGEvaluation(**cached["evaluation"]), cached["answer"]
+        
+        context = documents_context or self._format_documents(retrieved_chunks)
+        prompt = self._build_evaluate_and_answer_prompt(query, context)
         
         try:
-            response = self.llm.generate_with_json(prompt, system_prompt)
-            eval_data = json.loads(response)
-            
-            relevance_score = eval_data.get("relevance_score", 0.5)
-            relevance_label = eval_data.get("relevance_label", "ambiguous")
-            confidence = eval_data.get("confidence", 0.7)
-            
-            # Determine if web search is needed
-            needs_web_search = (
-                relevance_label == "irrelevant" or
-                (relevance_label == "ambiguous" and relevance_score < self.settings.crag_ambiguous_threshold)
+            response = await self.llm.generate_with_json(
+                prompt,
+                EVALUATE_AND_ANSWER_SYSTEM_PROMPT,
+                max_tokens=700,
+                json_schema=EVALUATE_AND_ANSWER_SCHEMA
             )
+            parsed = msgspec.json.decode(response, type=_EvaluateAndAnswerResponse)
             
-            return CRAGEvaluation(
-                relevance_score=relevance_score,
-                relevance_label=relevance_label,
-                confidence=confidence,
-                evaluation_method="llm_grader",
-                needs_web_search=needs_web_search,
-                evaluated_at=datetime.utcnow()
+            evaluation = self._build_evaluation(
+                relevance_score=parsed.relevance_score,
+                relevance_label=parsed.relevance_label,
+                confidence=parsed.confidence
             )
+            draft_answer = parsed.answer.strip() or None
             
         except Exception as e:
-            logger.error(f"Relevance evaluation error: {e}")
-            # Default to safe fallback
-            return CRAGEvaluation(
-                relevance_score=0.5,
-                relevance_label="ambiguous",
-                confidence=0.5,
-                evaluation_method="llm_grader",
-                needs_web_search=True,
-                evaluated_at=datetime.utcnow()
+            logger.error(f"Fused evaluation error: {e}")
+            return self._fallback_evaluation(), None
+        
+        await self.cache.set(
+            cache_key,
+            {"evaluation": evaluation.model_dump(), "answer": draft_answer}
+        )
+        return evaluation, draft_answer
+    
+    def _build_evaluate_and_answer_prompt(self, query: str, context: str) -> str:
+        """Prompt asking for the relevance grade and a draft answer together"""
+        return f"""Evaluate if the following retrieved documents are relevant to answer the query, then answer the query using them.
+
+Query: {query}
+
+Retrieved Documents:
+{context}
+
+{SCORING_GUIDE}
+For the answer, provide a clear, accurate answer based on the documents. If they don't fully answer the query, acknowledge what's missing. Leave the answer empty if the documents are irrelevant.
+"""
+    
+    def _format_documents(self, retrieved_chunks: list[RetrievedChunk]) -> str:
+        """Full chunk contents as numbered documents, for answer generation"""
+        return "\n\n".join([
+            f"Document {i+1}:\n{chunk.content}"
+            for i, chunk in enumerate(retrieved_chunks)
+        ])
+    
+    def _build_evaluation(
+        self,
+        relevance_score: float,
+        relevance_label: str,
+        confidence: float,
+        evaluation_method: str = "llm_grader",
+        web_search_threshold: float | None = None,
+        evaluated_at: datetime | None = None
+    ) -> CRAGEvaluation:
+        """
+        Build evaluation and decide whether web search is needed.
+
+        An ambiguous grade triggers web search when its score is below
+        web_search_threshold (default: crag_ambiguous_threshold).
+        evaluated_at lets batched callers stamp all evaluations at once.
+        """
+        if web_search_threshold is None:
+            web_search_threshold = self.ambiguous_threshold
+        if evaluated_at is None:
+            evaluated_at = datetime.now(timezone.utc)
+        
+        needs_web_search = (
+            relevance_label == "irrelevant" or
+            (relevance_label == "ambiguous" and relevance_score < web_search_threshold)
+        )
+        
+        # Inputs are already typed (msgspec-decoded or computed locally)
+        return CRAGEvaluation.model_construct(
+            relevance_score=relevance_score,
+            relevance_label=relevance_label,
+            confidence=confidence,
+            evaluation_method=evaluation_method,
+            needs_web_search=needs_web_search,
+            evaluated_at=evaluated_at
+        )
+    
+    def _cache_key(
+        self,
+        namespace: str,
+        query: str,
+        retrieved_chunks: list[RetrievedChunk],
+        *parts: str
+    ) -> str:
+        """Cache key over query, chunk IDs, model and prompt version"""
+        return self.cache.make_key(
+            namespace,
+            query,
+            [chunk.metadata.chunk_id for chunk in retrieved_chunks],
+            self.model,
+            CRAG_PROMPT_VERSION,
+            *parts
+        )
+    
+    def _fallback_evaluation(
+        self,
+        evaluation_method: str = "llm_grader",
+        evaluated_at: datetime | None = None
+    ) -> CRAGEvaluation:
+        """Safe default when evaluation fails: treat as ambiguous and search the web"""
+        return CRAGEvaluation.model_construct(
+            relevance_score=0.5,
+            relevance_label="ambiguous",
+            confidence=0.5,
+            evaluation_method=evaluation_method,
+            needs_web_search=True,
+            evaluated_at=evaluated_at or datetime.now(timezone.utc)
+        )
+    
+    async def execute_crag_single_pass(
+        self,
+        query: str,
+        retrieved_chunks: list[RetrievedChunk],
+        documents_context: str | None = None
+    ) -> CRAGResult | None:
+        """
+        Run grading, optional web search and answering as one Responses API call.
+
+        The model is given the hosted web search tool and decides itself
+        whether the documents need web augmentation, replacing the separate
+        grader, Tavily search and generator round trips.
+
+        Results share the fused grade + answer cache entry. A draft is only
+        kept when it agrees with the grade; otherwise the grade is reused and
+        only Tavily search (if the grade calls for it) and the answer step
+        remain for generate_answer_with_crag.
+
+        Returns:
+            CRAG result, with the answer drafted when usable, or None if the
+            Responses API call failed and the regular pipeline should be used
+        """
+        
+        context = documents_context or self._format_documents(retrieved_chunks)
+        
+        cache_key = self._cache_key("fused", query, retrieved_chunks)
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            evaluation = CRAGEvaluation(**cached["evaluation"])
+            draft_answer, searched, citations = cached["answer"], False, None
+        else:
+            prompt = f"""Evaluate if the following retrieved documents are relevant to answer the query, then answer the query.
+
+Query: {query}
+
+Retrieved Documents:
+{context}
+
+{SCORING_GUIDE}
+If the documents are irrelevant, or only partially answer the query, search the web and use the results in your answer. Grade only the retrieved documents, not the web results.
+"""
+            
+            try:
+                response, searched, citations = await self.llm.generate_with_web_search(
+                    prompt,
+                    json_schema=EVALUATE_AND_ANSWER_SCHEMA,
+                    system_prompt=EVALUATE_AND_ANSWER_SYSTEM_PROMPT,
+                    max_tokens=700
+                )
+                parsed = msgspec.json.decode(response, type=_EvaluateAndAnswerResponse)
+            except Exception as e:
+                logger.warning(f"CRAG single pass unavailable, using regular pipeline: {e}")
+                return None
+            
+            evaluation = self._build_evaluation(
+                relevance_score=parsed.relevance_score,
+                relevance_label=parsed.relevance_label,
+                confidence=parsed.confidence
+            )
+            draft_answer = parsed.answer.strip() or None
+            
+            # Like the fused entry, the cached draft is documents-only; one
+            # written from hosted search results is not replayed
+            await self.cache.set(
+                cache_key,
+                {
+                    "evaluation": evaluation.model_dump(),
+                    "answer": None if searched else draft_answer
+                }
+            )
+        
+        logger.info(
+            "CRAG single pass: {} (score: {:.2f}, web search: {})",
+            evaluation.relevance_label,
+            evaluation.relevance_score,
+            searched
+        )
+        
+        # The draft must agree with the grade: one written without the web
+        # search the grade calls for is dropped
+        if draft_answer and (searched or not evaluation.needs_web_search):
+            return CRAGResult.model_construct(
+                used_web_search=searched,
+                evaluation=evaluation,
+                retrieved_chunks=retrieved_chunks,
+                web_results=None,
+                web_citations=citations if searched else None,
+                draft_answer=draft_answer,
+                cached_context=context
             )
+        
+        # No usable draft: keep the grade, and fetch Tavily results for the
+        # answer step if the grade calls for web search
+        web_results = None
+        if evaluation.needs_web_search:
+            logger.info("CRAG single pass: no web-backed draft, using Tavily search")
+            web_results = await self.web_search.search(query, max_results=3)
+        
+        return CRAGResult.model_construct(
+            used_web_search=evaluation.needs_web_search,
+            evaluation=evaluation,
+            retrieved_chunks=retrieved_chunks,
+            web_results=web_results,
+            draft_answer=None,
+            cached_context=context
+        )
     
-    def execute_crag(
+    def _resolve_grade_locally(
         self,
         query: str,
-        retrieved_chunks: list[RetrievedChunk]
+        retrieved_chunks: list[RetrievedChunk],
+        fused: bool
+    ) -> tuple[CRAGEvaluation, str | None] | None:
+        """
+        Grade without a network call when possible.
+
+        Checks the in-process cache tier, then the embedding grader over the
+        chunk similarities.
+
+        Returns:
+            Tuple of (evaluation, draft answer), or None if grading needs a
+            network call
+        """
+        if fused:
+            cached = self.cache.get_local(self._cache_key("fused", query, retrieved_chunks))
+            if cached is not None:
+                return CRAGEvaluation(**cached["evaluation"]), cached["answer"]
+            return None
+        
+        cached = self.cache.get_local(
+            self._cache_key("grader", query, retrieved_chunks, self.evaluation_method)
+        )
+        if cached is not None:
+            return CRAGEvaluation(**cached), None
+        
+        if self.evaluation_method == "embedding_grader":
+            evaluation = self._evaluate_by_similarity(retrieved_chunks)
+            if evaluation is not None:
+                return evaluation, None
+        return None
+    
+    async def execute_crag(
+        self,
+        query: str,
+        retrieved_chunks: list[RetrievedChunk],
+        with_answer: bool = False
     ) -> CRAGResult:
-        """Execute Corrective RAG pipeline"""
+        """
+        Execute Corrective RAG pipeline.
+
+        Args:
+            query: User's query
+            retrieved_chunks: Chunks retrieved for the query
+            with_answer: Draft the answer in the same LLM call as the relevance
+                grade, so generate_answer_with_crag can skip its own call when
+                no web search is needed. Ignored by the LLM grader when batch
+                grading is enabled. With crag_single_pass_enabled, the whole
+                pipeline runs as one Responses API call instead.
+
+        Returns:
+            CRAG result with evaluation, web results and optional draft answer
+        """
         
-        # Step 1: Evaluate relevance
-        evaluation = self.evaluate_relevance(query, retrieved_chunks)
+        # Documents are formatted once and shared by the grade and answer steps
+        documents_context = self._format_documents(retrieved_chunks) if with_answer else None
         
-        logger.info(f"CRAG Evaluation: {evaluation.relevance_label} (score: {evaluation.relevance_score:.2f})")
+        if with_answer and self.single_pass_enabled:
+            crag_result = await self.execute_crag_single_pass(
+                query, retrieved_chunks, documents_context
+            )
+            if crag_result is not None:
+                return crag_result
+        
+        # Step 1: Evaluate relevance. The fused grade + answer prompt only
+        # applies to the LLM grader, and is skipped when batch grading is on
+        # so the grade goes through the batcher.
+        fused = (
+            with_answer
+            and self.evaluation_method == "llm_grader"
+            and self.batcher is None
+        )
+        web_task = None
+        local_grade = self._resolve_grade_locally(query, retrieved_chunks, fused)
+        if local_grade is not None:
+            # No grader round trip to overlap with, so no speculative search
+            evaluation, draft_answer = local_grade
+        else:
+            # Speculatively start the web search alongside the grader so its
+            # latency overlaps instead of adding up
+            if fused:
+                grader_task = asyncio.create_task(
+                    self.evaluate_and_answer(query, retrieved_chunks, documents_context)
+                )
+            else:
+                grader_task = asyncio.create_task(self.evaluate_relevance(query, retrieved_chunks))
+            web_task = asyncio.create_task(self.web_search.search(query, max_results=3))
+            
+            try:
+                if fused:
+                    evaluation, draft_answer = await grader_task
+                else:
+                    evaluation, draft_answer = await grader_task, None
+            except BaseException:
+                web_task.cancel()
+                raise
+        
+        logger.info(
+            "CRAG Evaluation: {} (score: {:.2f})",
+            evaluation.relevance_label,
+            evaluation.relevance_score
+        )
         
         web_results = None
         used_web_search = False
         
         # Step 2: Route based on evaluation
         if evaluation.needs_web_search:
-            logger.info("CRAG: Triggering web search")
-            web_results = self.web_search.search(query, max_results=3)
+            logger.info("CRAG: Using web search")
+            if web_task is not None:
+                web_results = await web_task
+            else:
+                web_results = await self.web_search.search(query, max_results=3)
             used_web_search = True
+            # Draft was written without web context; answer is re-synthesized
+            draft_answer = None
+        elif web_task is not None:
+            web_task.cancel()
         
-        return CRAGResult(
+        # All parts are already validated models or our own results
+        return CRAGResult.model_construct(
             used_web_search=used_web_search,
             evaluation=evaluation,
             retrieved_chunks=retrieved_chunks,
-            web_results=web_results
+            web_results=web_results,
+            draft_answer=draft_answer,
+            cached_context=documents_context
         )
     
-    def generate_answer_with_crag(
+    async def execute_crag_batch(self, jobs: list[CRAGJob]) -> str:
+        """
+        Submit CRAG jobs to the OpenAI Batch API for offline processing.
+
+        Each job is graded and answered with the fused prompt. Web search
+        cannot run inside a batch, so jobs whose evaluation needs it are
+        flagged in the results for the caller to follow up on.
+
+        Args:
+            jobs: CRAG jobs with unique job IDs
+
+        Returns:
+            Batch ID, to be passed to collect_crag_batch
+        """
+        if not self.settings.crag_batch_mode:
+            raise ValueError("CRAG batch mode is disabled. Set CRAG_BATCH_MODE=true in .env file.")
+        
+        requests = []
+        for job in jobs:
+            prompt = self._build_evaluate_and_answer_prompt(
+                job.query,
+                self._format_documents(job.retrieved_chunks)
+            )
+            requests.append({
+                "custom_id": job.job_id,
+                "body": {
+                    "model": self.model,
+                    "messages": [
+                        {"role": "system", "content": EVALUATE_AND_ANSWER_SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    "temperature": 0.0,
+                    "max_tokens": 700,
+                    "response_format": {
+                        "type": "json_schema",
+                        "json_schema": EVALUATE_AND_ANSWER_SCHEMA
+                    }
+                }
+            })
+        
+        return await self.llm.submit_batch(requests)
+    
+    async def collect_crag_batch(
+        self,
+        batch_id: str,
+        jobs: list[CRAGJob]
+    ) -> dict[str, CRAGResult] | None:
+        """
+        Collect results of a batch submitted with execute_crag_batch.
+
+        Args:
+            batch_id: ID returned by execute_crag_batch
+            jobs: The submitted jobs, used to attach their chunks to results
+
+        Returns:
+            Mapping of job ID to CRAG result, or None while the batch is
+            still running. Results carry the drafted answer unless the
+            evaluation needs web search; jobs that failed get the fallback
+            evaluation and no answer.
+        """
+        responses = await self.llm.get_batch_results(batch_id)
+        if responses is None:
+            return None
+        
+        results = {}
+        for job in jobs:
+            evaluation, draft_answer = self._fallback_evaluation(), None
+            response = responses.get(job.job_id)
+            if response is not None:
+                try:
+                    parsed = msgspec.json.decode(response, type=_EvaluateAndAnswerResponse)
+                    evaluation = self._build_evaluation(
+                        relevance_score=parsed.relevance_score,
+                        relevance_label=parsed.relevance_label,
+                        confidence=parsed.confidence
+                    )
+                    # As in execute_crag, a draft written without the needed
+                    # web context is not kept
+                    if not evaluation.needs_web_search:
+                        draft_answer = parsed.answer.strip() or None
+                except Exception as e:
+                    logger.error(f"Batch job {job.job_id} parse error: {e}")
+            
+            results[job.job_id] = CRAGResult.model_construct(
+                used_web_search=False,
+                evaluation=evaluation,
+                retrieved_chunks=job.retrieved_chunks,
+                web_results=None,
+                draft_answer=draft_answer,
+                cached_context=None
+            )
+        
+        return results
+    
+    async def generate_answer_with_crag(
         self,
         query: str,
         crag_result: CRAGResult
     ) -> str:
         """Generate final answer using CRAG results"""
         
+        # Answer already drafted alongside the relevance grade
+        if crag_result.draft_answer:
+            return crag_result.draft_answer
+        
+        web_urls = [result.get("url") or "" for result in crag_result.web_results or []]
+        cache_key = self._cache_key(
+            "answer",
+            query,
+            crag_result.retrieved_chunks,
+            crag_result.evaluation.relevance_label,
+            ",".join(web_urls)
+        )
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         # Build context based on CRAG routing
         context_parts = []
         
@@ -130,10 +964,13 @@ Scoring guide:
                 for i, result in enumerate(crag_result.web_results, 1):
                     context_parts.append(f"\nSource {i} ({result['title']}):\n{result['content']}")
         else:
-            # Use retrieved chunks (and optionally web results for ambiguous)
-            context_parts.append("=== Retrieved Documents ===")
-            for i, chunk in enumerate(crag_result.retrieved_chunks, 1):
-                context_parts.append(f"\nDocument {i}:\n{chunk.content}")
+            # Use retrieved chunks (and optionally web results for ambiguous),
+            # reusing the documents formatted during execute_crag if available
+            documents = crag_result.cached_context or self._format_documents(
+                crag_result.retrieved_chunks
+            )
+            context_parts.append("=== Retrieved Documents ===\n")
+            context_parts.append(documents)
             
             if crag_result.used_web_search and crag_result.web_results:
                 context_parts.append("\n\n=== Additional Web Information ===")
@@ -142,18 +979,21 @@ Scoring guide:
         
         context = "\n".join(context_parts)
         
-        prompt = f"""Answer the following query using the provided context.
-
-Query: {query}
+        prompt = f"""Query: {query}
 
 Context:
 {context}
 
-Provide a clear, accurate answer based on the context. If the context doesn't fully answer the query, acknowledge what's missing."""
-        
-        system_prompt = "You are a helpful assistant that answers questions based on provided context."
+If the context doesn't fully answer the query, say what's missing."""
         
-        return self.llm.generate(prompt, system_prompt, max_tokens=500)
+        answer = await self.llm.generate(
+            prompt,
+            ANSWER_SYSTEM_PROMPT,
+            max_tokens=500,
+            stop=["\n\n\n"]
+        )
+        await self.cache.set(cache_key, answer)
+        return answer
 
     def get_augmented_chunks(self, crag_result: CRAGResult) -> list[RetrievedChunk]:
         """
@@ -162,7 +1002,7 @@ Provide a clear, accurate answer based on the context. If the context doesn't fu
         """
         chunks = []
         tokenizer = tiktoken.get_encoding("cl100k_base")
-        now = datetime.utcnow()
+        now = datetime.now(timezone.utc)
 
         if crag_result.evaluation.relevance_label == "irrelevant":
             # Use only web search results
@@ -226,3 +1066,8 @@ Provide a clear, accurate answer based on the context. If the context doesn't fu
                     ))
 
         return chunks
+
+
+@lru_cache
+def get_crag_service() -> CRAGService:
+    return CRAGService()
@@ -1,18 +1,24 @@
-from openai import OpenAI
+from openai import AsyncOpenAI
 from app.config import get_settings
+from functools import lru_cache
+from app.services.http_client import get_http_client
 from loguru import logger
 
 
 class EmbeddingService:
     def __init__(self):
         self.settings = get_settings()
-        self.client = OpenAI(api_key=self.settings.openai_api_key)
+        self.client = AsyncOpenAI(
+            api_key=self.settings.openai_api_key,
+            http_client=get_http_client(),
+            timeout=self.settings.http_timeout
+        )
         self.model = self.settings.embedding_model
     
-    def embed_text(self, text: str) -> list[float]:
+    async def embed_text(self, text: str) -> list[float]:
         """Generate embedding for single text"""
         try:
-            response = self.client.embeddings.create(
+            response = await self.client.embeddings.create(
                 model=self.model,
                 input=text
             )
@@ -21,13 +27,13 @@ class EmbeddingService:
             logger.error(f"Embedding generation error: {e}")
             raise
     
-    def embed_batch(self, texts: list[str], batch_size: int = 100) -> list[list[float]]:
+    async def embed_batch(self, texts: list[str], batch_size: int = 100) -> list[list[float]]:
         """Generate embeddings for batch of texts"""
         embeddings = []
         for i in range(0, len(texts), batch_size):
             batch = texts[i:i + batch_size]
             try:
-                response = self.client.embeddings.create(
+                response = await self.client.embeddings.create(
                     model=self.model,
                     input=batch
                 )
@@ -37,3 +43,8 @@ class EmbeddingService:
                 logger.error(f"Batch embedding error: {e}")
                 raise
         return embeddings
+
+
+@lru_cache
+def get_embedding_service() -> EmbeddingService:
+    return EmbeddingService()
@@ -0,0 +1,32 @@
+from functools import lru_cache
+from app.config import get_settings
+import httpx
+
+
+@lru_cache
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Shared async HTTP client for all outbound API calls (OpenAI, Tavily).
+
+    A single HTTP/2 connection pool lets concurrent requests (e.g. the CRAG
+    grader and a speculative web search) ride already-open connections
+    instead of paying a fresh TCP/TLS handshake each time. Idle connections
+    are kept for a minute so back-to-back pipeline calls reuse them.
+    """
+    settings = get_settings()
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=100,
+            max_keepalive_connections=64,
+            keepalive_expiry=60
+        ),
+        timeout=httpx.Timeout(settings.http_timeout)
+    )
+
+
+async def close_http_client() -> None:
+    """Close the shared client's connection pool, if it was ever created"""
+    if get_http_client.cache_info().currsize:
+        await get_http_client().aclose()
+        get_http_client.cache_clear()
@@ -1,5 +1,6 @@
-from app.services.llm_service import LLMService
+from app.services.llm_service import get_llm_service
 from app.config import get_settings
+from functools import lru_cache
 from loguru import logger
 import json
 
@@ -14,9 +15,9 @@ class HydeService:
 
     def __init__(self):
         self.settings = get_settings()
-        self.llm = LLMService()
+        self.llm = get_llm_service()
 
-    def generate_hypothetical_documents(
+    async def generate_hypothetical_documents(
         self,
         query: str,
         num_hypotheses: int = None
@@ -60,7 +61,7 @@ Return ONLY a JSON object in this format:
 }}"""
 
         try:
-            response = self.llm.generate_with_json(
+            response = await self.llm.generate_with_json(
                 prompt=user_prompt,
                 system_prompt=system_prompt,
                 temperature=0.7  # Higher temperature for diversity
@@ -91,3 +92,8 @@ Return ONLY a JSON object in this format:
         except Exception as e:
             logger.error(f"HYDE: Hypothesis generation error: {e}, falling back to query")
             return [query]
+
+
+@lru_cache
+def get_hyde_service() -> HydeService:
+    return HydeService()
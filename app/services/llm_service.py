@@ -1,55 +1,247 @@
-from openai import OpenAI
+from openai import AsyncOpenAI
 from app.config import get_settings
+from functools import lru_cache
+from app.services.http_client import get_http_client
 from loguru import logger
+import math
+import msgspec
 
 
 class LLMService:
     def __init__(self):
         self.settings = get_settings()
-        self.client = OpenAI(api_key=self.settings.openai_api_key)
+        self.client = AsyncOpenAI(
+            api_key=self.settings.openai_api_key,
+            http_client=get_http_client(),
+            timeout=self.settings.http_timeout
+        )
         self.model = self.settings.llm_model
     
-    def generate(
+    async def generate(
         self,
         prompt: str,
         system_prompt: str = "You are a helpful AI assistant.",
         temperature: float = 0.0,
-        max_tokens: int = 1000
+        max_tokens: int = 1000,
+        stop: list[str] | None = None
     ) -> str:
-        """Generate completion from OpenAI"""
+        """Generate completion from OpenAI, optionally cut at a stop sequence"""
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=temperature,
-                max_tokens=max_tokens
+                max_tokens=max_tokens,
+                stop=stop
             )
             return response.choices[0].message.content.strip()
         except Exception as e:
             logger.error(f"LLM generation error: {e}")
             raise
     
-    def generate_with_json(
+    async def generate_with_json(
         self,
         prompt: str,
         system_prompt: str = "You are a helpful AI assistant.",
-        temperature: float = 0.0
+        temperature: float = 0.0,
+        max_tokens: int | None = None,
+        json_schema: dict | None = None
     ) -> str:
-        """Generate with JSON response format"""
+        """
+        Generate with JSON response format.
+
+        When json_schema is given, structured outputs constrain decoding to that
+        schema; otherwise the model is only asked for a JSON object. Output is
+        only capped when max_tokens is given, since a truncated object cannot
+        be parsed.
+        """
+        if json_schema is not None:
+            response_format = {"type": "json_schema", "json_schema": json_schema}
+        else:
+            response_format = {"type": "json_object"}
+
+        limits = {"max_tokens": max_tokens} if max_tokens is not None else {}
+
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=temperature,
-                response_format={"type": "json_object"}
+                response_format=response_format,
+                **limits
             )
             return response.choices[0].message.content.strip()
         except Exception as e:
             logger.error(f"LLM JSON generation error: {e}")
             raise
+    
+    async def generate_label_probabilities(
+        self,
+        prompt: str,
+        labels: list[str],
+        system_prompt: str = "You are a helpful AI assistant."
+    ) -> dict[str, float]:
+        """
+        Generate a single token and return the probability mass on each label.
+
+        Labels should be single-token strings; probabilities come from the
+        top logprobs of the first generated token.
+        """
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.0,
+                max_tokens=1,
+                logprobs=True,
+                top_logprobs=5
+            )
+            probabilities = {label: 0.0 for label in labels}
+            for candidate in response.choices[0].logprobs.content[0].top_logprobs:
+                token = candidate.token.strip()
+                if token in probabilities:
+                    probabilities[token] += math.exp(candidate.logprob)
+            return probabilities
+        except Exception as e:
+            logger.error(f"LLM logprob generation error: {e}")
+            raise
+    
+    async def generate_with_web_search(
+        self,
+        prompt: str,
+        json_schema: dict,
+        system_prompt: str = "You are a helpful AI assistant.",
+        max_tokens: int = 1000
+    ) -> tuple[str, bool, list[dict]]:
+        """
+        Generate structured output via the Responses API with hosted web search.
+
+        The model decides on its own whether to search, so grading, search
+        and answering happen in one request.
+
+        Returns:
+            Tuple of (output text, whether the model searched, title/url of
+            each distinct web source cited in the output)
+        """
+        try:
+            response = await self.client.responses.create(
+                model=self.model,
+                instructions=system_prompt,
+                input=prompt,
+                tools=[{"type": "web_search_preview"}],
+                tool_choice="auto",
+                text={"format": {"type": "json_schema", **json_schema}},
+                temperature=0.0,
+                max_output_tokens=max_tokens
+            )
+        except Exception as e:
+            logger.error(f"LLM web search generation error: {e}")
+            raise
+
+        output_text = response.output_text
+        # Annotations only point into the model's own output, not the source
+        # page, so citations carry just the title and url
+        citations = {}
+        for item in response.output:
+            if item.type != "message":
+                continue
+            for part in item.content:
+                for annotation in getattr(part, "annotations", None) or []:
+                    if annotation.type == "url_citation":
+                        citations.setdefault(annotation.url, {
+                            "title": annotation.title,
+                            "url": annotation.url
+                        })
+
+        searched = any(item.type == "web_search_call" for item in response.output)
+
+        return output_text.strip(), searched, list(citations.values())
+    
+    async def submit_batch(self, requests: list[dict]) -> str:
+        """
+        Submit chat completion requests to the OpenAI Batch API.
+
+        Args:
+            requests: Dicts with a custom_id and a chat completions request body
+
+        Returns:
+            Batch ID, to be passed to get_batch_results
+        """
+        lines = [
+            msgspec.json.encode({
+                "custom_id": request["custom_id"],
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": request["body"]
+            })
+            for request in requests
+        ]
+
+        try:
+            input_file = await self.client.files.create(
+                file=("crag_batch.jsonl", b"\n".join(lines)),
+                purpose="batch"
+            )
+            batch = await self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            logger.info(f"Submitted batch {batch.id} with {len(requests)} requests")
+            return batch.id
+        except Exception as e:
+            logger.error(f"Batch submission error: {e}")
+            raise
+
+    async def get_batch_results(self, batch_id: str) -> dict[str, str | None] | None:
+        """
+        Fetch results of a batch submitted with submit_batch.
+
+        Returns:
+            Mapping of custom_id to response content (None for failed requests),
+            or None while the batch is still running. Raises if the batch
+            failed, expired or was cancelled.
+        """
+        batch = await self.client.batches.retrieve(batch_id)
+
+        if batch.status in ("failed", "expired", "cancelled", "cancelling"):
+            raise RuntimeError(f"Batch {batch_id} ended with status '{batch.status}'")
+        if batch.status != "completed":
+            logger.info(f"Batch {batch_id} status: {batch.status}")
+            return None
+
+        results = {}
+        if batch.output_file_id:
+            output = await self.client.files.content(batch.output_file_id)
+            for line in output.text.splitlines():
+                if not line.strip():
+                    continue
+                item = msgspec.json.decode(line)
+                response = item.get("response") or {}
+                content = None
+                if response.get("status_code") == 200:
+                    content = response["body"]["choices"][0]["message"]["content"]
+                results[item["custom_id"]] = content
+
+        # Requests that errored are only listed in the error file
+        if batch.error_file_id:
+            errors = await self.client.files.content(batch.error_file_id)
+            for line in errors.text.splitlines():
+                if line.strip():
+                    results.setdefault(msgspec.json.decode(line)["custom_id"], None)
+
+        return results
+
+
+@lru_cache
+def get_llm_service() -> LLMService:
+    return LLMService()
@@ -0,0 +1,115 @@
+from typing import Awaitable, Callable
+from app.models import CRAGEvaluation, RetrievedChunk
+from loguru import logger
+import asyncio
+
+
+BatchGrader = Callable[
+    [list[tuple[str, list[RetrievedChunk]]]],
+    Awaitable[list[CRAGEvaluation | None]]
+]
+
+
+class RelevanceBatcher:
+    """
+    Micro-batcher that coalesces concurrent relevance evaluations.
+
+    Requests are queued and a background worker collects them until either
+    max_batch_size are waiting or window_ms has passed since the first one,
+    then grades the whole batch with a single LLM call. The worker starts
+    lazily on the first request, inside the running event loop.
+    """
+
+    def __init__(
+        self,
+        grade_batch: BatchGrader,
+        max_batch_size: int = 8,
+        window_ms: int = 50
+    ):
+        self.grade_batch = grade_batch
+        self.max_batch_size = max_batch_size
+        self.window = window_ms / 1000
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._in_flight: set[asyncio.Task] = set()
+
+    async def evaluate(
+        self,
+        query: str,
+        retrieved_chunks: list[RetrievedChunk]
+    ) -> CRAGEvaluation:
+        """Queue one evaluation and wait for its batched result"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, retrieved_chunks, future))
+        return await future
+
+    async def aclose(self) -> None:
+        """Stop the worker and cancel in-flight and queued evaluations"""
+        tasks = [task for task in (self._worker, *self._in_flight) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Requests the worker never picked up would otherwise wait forever
+        while self._queue is not None and not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            future.cancel()
+
+        self._worker = None
+        self._queue = None
+
+    async def _run(self):
+        """Collect queued requests into batches and dispatch them"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+
+            try:
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Closed while collecting: release the requests already taken
+                for _, _, future in batch:
+                    future.cancel()
+                raise
+
+            # Grade in a separate task so the next batch can fill meanwhile
+            task = asyncio.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, batch: list[tuple[str, list[RetrievedChunk], asyncio.Future]]):
+        """Grade one batch and resolve its futures"""
+        logger.info("CRAG: Grading batch of {} queries", len(batch))
+
+        try:
+            evaluations = await self.grade_batch([(query, chunks) for query, chunks, _ in batch])
+        except asyncio.CancelledError:
+            for _, _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), evaluation in zip(batch, evaluations):
+            if future.done():
+                continue
+            if evaluation is None:
+                future.set_exception(ValueError("Batch grader returned no grade for query"))
+            else:
+                future.set_result(evaluation)
@@ -2,6 +2,7 @@ from typing import Protocol
 from sentence_transformers import CrossEncoder
 from app.models import RetrievedChunk
 from app.config import get_settings
+from functools import lru_cache
 from loguru import logger
 
 
@@ -187,3 +188,8 @@ class RerankingService:
 
         # Delegate to backend
         return self.backend.rerank(query, retrieved_chunks, top_k)
+
+
+@lru_cache
+def get_reranking_service() -> RerankingService:
+    return RerankingService()
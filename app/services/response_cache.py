@@ -0,0 +1,105 @@
+from collections import OrderedDict
+from hashlib import blake2b
+from app.config import get_settings
+from loguru import logger
+import msgspec
+import time
+
+
+class ResponseCache:
+    """
+    Two-tier cache for LLM responses: an in-process LRU in front of Redis.
+
+    Redis is optional; without REDIS_URL only the in-process tier is used.
+    Values are msgspec-encoded, so anything msgspec can serialize (dicts,
+    lists, strings, datetimes) can be stored. Cache failures are logged and
+    treated as misses so they never break a query.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self.enabled = self.settings.crag_cache_enabled
+        self.ttl = self.settings.crag_cache_ttl
+        self.max_entries = self.settings.crag_cache_max_entries
+        self._local: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._redis = None
+
+        if self.enabled and self.settings.redis_url:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                raise ImportError(
+                    "redis package required when REDIS_URL is set. "
+                    "Install with: uv sync --extra cache"
+                )
+            self._redis = redis.from_url(self.settings.redis_url)
+            logger.info("Response cache backed by Redis")
+
+    @staticmethod
+    def make_key(namespace: str, query: str, chunk_ids: list[str], *parts: str) -> str:
+        """Stable key from the normalized query, the chunk ID set and any extra parts"""
+        raw = "|".join([query.strip().lower(), ",".join(sorted(chunk_ids)), *parts])
+        return f"crag:{namespace}:{blake2b(raw.encode(), digest_size=16).hexdigest()}"
+
+    async def get(self, key: str):
+        """Return the cached value for key, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        value = self.get_local(key)
+        if value is not None:
+            return value
+
+        if self._redis is None:
+            return None
+
+        try:
+            data = await self._redis.get(key)
+        except Exception as e:
+            logger.warning(f"Redis cache get error: {e}")
+            return None
+
+        if data is None:
+            return None
+
+        self._set_local(key, data)
+        return msgspec.json.decode(data)
+
+    def get_local(self, key: str):
+        """Return the value from the in-process tier only, without any I/O"""
+        if not self.enabled:
+            return None
+
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+
+        expires_at, data = entry
+        if expires_at <= time.monotonic():
+            del self._local[key]
+            return None
+
+        self._local.move_to_end(key)
+        return msgspec.json.decode(data)
+
+    async def set(self, key: str, value) -> None:
+        """Store value in both tiers with the configured TTL"""
+        if not self.enabled:
+            return
+
+        data = msgspec.json.encode(value)
+        self._set_local(key, data)
+
+        if self._redis is None:
+            return
+
+        try:
+            await self._redis.setex(key, self.ttl, data)
+        except Exception as e:
+            logger.warning(f"Redis cache set error: {e}")
+
+    def _set_local(self, key: str, data: bytes) -> None:
+        self._local[key] = (time.monotonic() + self.ttl, data)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
@@ -1,6 +1,7 @@
-from app.services.llm_service import LLMService
+from app.services.llm_service import get_llm_service
 from app.models import ReflectionResult, SelfReflectiveResult, RetrievedChunk
 from app.config import get_settings
+from functools import lru_cache
 from datetime import datetime
 from loguru import logger
 import json
@@ -9,9 +10,9 @@ import json
 class SelfReflectiveService:
     def __init__(self):
         self.settings = get_settings()
-        self.llm = LLMService()
+        self.llm = get_llm_service()
     
-    def generate_initial_answer(
+    async def generate_initial_answer(
         self,
         query: str,
         retrieved_chunks: list[RetrievedChunk]
@@ -34,9 +35,9 @@ Provide a clear, accurate answer."""
         
         system_prompt = "You are a helpful assistant that answers questions based on provided context."
         
-        return self.llm.generate(prompt, system_prompt, max_tokens=500)
+        return await self.llm.generate(prompt, system_prompt, max_tokens=500)
     
-    def reflect_on_answer(
+    async def reflect_on_answer(
         self,
         query: str,
         answer: str,
@@ -79,7 +80,7 @@ Criteria:
         system_prompt = "You are an answer evaluator for RAG systems. Always respond with valid JSON."
         
         try:
-            response = self.llm.generate_with_json(prompt, system_prompt)
+            response = await self.llm.generate_with_json(prompt, system_prompt)
             reflection_data = json.loads(response)
 
             # Convert sources_cited to strings (LLM may return integers)
@@ -108,7 +109,7 @@ Criteria:
                 reflected_at=datetime.utcnow()
             )
     
-    def execute_self_reflective(
+    async def execute_self_reflective(
         self,
         query: str,
         retrieved_chunks: list[RetrievedChunk],
@@ -128,10 +129,10 @@ Criteria:
             logger.info(f"Self-Reflective iteration {iterations}")
             
             # Generate answer
-            answer = self.generate_initial_answer(query, current_chunks)
+            answer = await self.generate_initial_answer(query, current_chunks)
             
             # Reflect on answer
-            reflection = self.reflect_on_answer(query, answer, current_chunks)
+            reflection = await self.reflect_on_answer(query, answer, current_chunks)
             
             logger.info(f"Reflection score: {reflection.reflection_score:.2f}, Grounded: {reflection.answer_grounded}")
             
@@ -145,8 +146,8 @@ Criteria:
             # If not good and we have retries left, refine and retry
             if reflection.needs_regeneration and iterations < max_iterations:
                 logger.info("Self-Reflective: Refining query and retrying")
-                refined_query = self._refine_query(query, reflection)
-                current_chunks = retrieval_function(refined_query)
+                refined_query = await self._refine_query(query, reflection)
+                current_chunks = await retrieval_function(refined_query)
             else:
                 final_answer = answer
                 final_reflection = reflection
@@ -163,7 +164,7 @@ Criteria:
             retrieved_chunks=current_chunks
         )
     
-    def _refine_query(self, original_query: str, reflection: ReflectionResult) -> str:
+    async def _refine_query(self, original_query: str, reflection: ReflectionResult) -> str:
         """Refine query based on reflection feedback"""
         
         prompt = f"""The original query didn't retrieve good enough information. Refine the query to get better results.
@@ -177,9 +178,14 @@ Provide a refined query that might retrieve more relevant information. Return on
         system_prompt = "You are a query refinement expert for retrieval systems."
         
         try:
-            refined = self.llm.generate(prompt, system_prompt, max_tokens=100)
+            refined = await self.llm.generate(prompt, system_prompt, max_tokens=100)
             logger.info(f"Refined query: {refined}")
             return refined.strip()
         except Exception as e:
             logger.error(f"Query refinement error: {e}")
             return original_query
+
+
+@lru_cache
+def get_self_reflective_service() -> SelfReflectiveService:
+    return SelfReflectiveService()
@@ -1,4 +1,4 @@
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.models import (
     Distance, VectorParams, PointStruct,
     Filter, FieldCondition, MatchValue,
@@ -6,53 +6,90 @@ from qdrant_client.models import (
     Prefetch, FusionQuery, Fusion
 )
 from app.config import get_settings
+from functools import lru_cache
 from app.services.sparse_vector_service import SparseVectorService
 from loguru import logger
 from uuid import uuid4
+import asyncio
+import numpy as np
+
+
+def _cosine_similarities(query_vector: list[float], vectors: list[list[float]]) -> list[float]:
+    """Cosine similarity between the query vector and each vector, as one matrix product"""
+    if not vectors:
+        return []
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    query = np.asarray(query_vector, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    similarities = np.divide(
+        matrix @ query,
+        norms,
+        out=np.zeros(len(vectors), dtype=np.float32),
+        where=norms > 0
+    )
+    return similarities.tolist()
 
 
 class VectorStore:
     def __init__(self):
         self.settings = get_settings()
-        self.client = QdrantClient(
+        self.client = AsyncQdrantClient(
             url=self.settings.qdrant_url,
             api_key=self.settings.qdrant_api_key
         )
         self.collection_name = self.settings.qdrant_collection_name
         self.sparse_service = SparseVectorService()
-        self._ensure_collection()
+        self._collection_ready = False
+        self._collection_lock = asyncio.Lock()
     
-    def _ensure_collection(self):
-        """Create hybrid collection with dense and sparse vectors if it doesn't exist"""
-        try:
-            collections = self.client.get_collections().collections
-            exists = any(c.name == self.collection_name for c in collections)
-
-            if not exists:
-                self.client.create_collection(
-                    collection_name=self.collection_name,
-                    vectors_config={
-                        "dense": VectorParams(
-                            size=self.settings.embedding_dimensions,
-                            distance=Distance.COSINE
-                        )
-                    },
-                    sparse_vectors_config={
-                        "sparse": SparseVectorParams()
-                    }
-                )
-                logger.info(f"Created hybrid collection: {self.collection_name}")
-        except Exception as e:
-            logger.error(f"Collection creation error: {e}")
-            raise
+    async def _ensure_collection(self):
+        """
+        Create hybrid collection with dense and sparse vectors if it doesn't exist.
+
+        Runs once, lazily on first use, since the async client cannot be
+        awaited from __init__.
+        """
+        if self._collection_ready:
+            return
+
+        async with self._collection_lock:
+            if self._collection_ready:
+                return
+
+            try:
+                collections = (await self.client.get_collections()).collections
+                exists = any(c.name == self.collection_name for c in collections)
+
+                if not exists:
+                    await self.client.create_collection(
+                        collection_name=self.collection_name,
+                        vectors_config={
+                            "dense": VectorParams(
+                                size=self.settings.embedding_dimensions,
+                                distance=Distance.COSINE
+                            )
+                        },
+                        sparse_vectors_config={
+                            "sparse": SparseVectorParams()
+                        }
+                    )
+                    logger.info(f"Created hybrid collection: {self.collection_name}")
+            except Exception as e:
+                logger.error(f"Collection creation error: {e}")
+                raise
+
+            self._collection_ready = True
     
-    def upsert_chunks(
+    async def upsert_chunks(
         self,
         chunks: list[str],
         embeddings: list[list[float]],
         metadatas: list[dict]
     ) -> list[str]:
         """Insert chunks with both dense and sparse vectors"""
+        await self._ensure_collection()
+
         points = []
         chunk_ids = []
 
@@ -76,7 +113,7 @@ class VectorStore:
             ))
 
         try:
-            self.client.upsert(
+            await self.client.upsert(
                 collection_name=self.collection_name,
                 points=points
             )
@@ -86,51 +123,58 @@ class VectorStore:
             logger.error(f"Upsert error: {e}")
             raise
     
-    def search_dense(
+    async def search_dense(
         self,
         query_vector: list[float],
         top_k: int,
-        search_filter=None
+        search_filter=None,
+        with_vectors=False
     ) -> list:
         """Dense-only semantic search"""
-        return self.client.query_points(
+        response = await self.client.query_points(
             collection_name=self.collection_name,
             query=query_vector,
             using="dense",
             query_filter=search_filter,
             limit=top_k,
-            with_payload=True
-        ).points
+            with_payload=True,
+            with_vectors=with_vectors
+        )
+        return response.points
 
-    def search_sparse(
+    async def search_sparse(
         self,
         query_text: str,
         top_k: int,
-        search_filter=None
+        search_filter=None,
+        with_vectors=False
     ) -> list:
         """Sparse-only keyword search (BM25)"""
         sparse_query = self.sparse_service.generate_sparse_vector(query_text)
 
-        return self.client.query_points(
+        response = await self.client.query_points(
             collection_name=self.collection_name,
             query=sparse_query,
             using="sparse",
             query_filter=search_filter,
             limit=top_k,
-            with_payload=True
-        ).points
+            with_payload=True,
+            with_vectors=with_vectors
+        )
+        return response.points
 
-    def search_hybrid(
+    async def search_hybrid(
         self,
         query_vector: list[float],
         query_text: str,
         top_k: int,
-        search_filter=None
+        search_filter=None,
+        with_vectors=False
     ) -> list:
         """Hybrid search with RRF fusion"""
         sparse_query = self.sparse_service.generate_sparse_vector(query_text)
 
-        return self.client.query_points(
+        response = await self.client.query_points(
             collection_name=self.collection_name,
             prefetch=[
                 Prefetch(query=sparse_query, using="sparse", limit=top_k * 3),
@@ -138,16 +182,20 @@ class VectorStore:
             ],
             query=FusionQuery(fusion=Fusion.RRF),
             limit=top_k,
-            with_payload=True
-        ).points
+            with_payload=True,
+            with_vectors=with_vectors
+        )
+        return response.points
 
-    def search(
+    async def search(
         self,
         query_vector: list[float],
         top_k: int = 5,
         filter_conditions: dict | None = None,
         mode: str = "hybrid",
-        query_text: str | None = None
+        query_text: str | None = None,
+        with_similarity: bool = False,
+        similarity_vector: list[float] | None = None
     ) -> list[dict]:
         """
         Search for similar chunks using specified mode.
@@ -158,47 +206,69 @@ class VectorStore:
             filter_conditions: Optional filter conditions
             mode: Search mode - "dense", "sparse", or "hybrid" (default)
             query_text: Original query text (required for sparse/hybrid modes)
+            with_similarity: Also return the raw dense cosine similarity between
+                query_vector and each hit, regardless of the fused/sparse score
+            similarity_vector: Vector to measure similarity against instead of
+                query_vector (e.g. the user query when searching by a HyDE
+                hypothesis)
 
         Returns:
             List of search results with scores and metadata
         """
+        await self._ensure_collection()
+
         try:
             search_filter = None
             if filter_conditions:
                 # Build Qdrant filter from conditions if needed
                 pass
 
+            with_vectors = ["dense"] if with_similarity else False
+
             # Delegate to appropriate search method
             if mode == "dense":
-                results = self.search_dense(query_vector, top_k, search_filter)
+                results = await self.search_dense(query_vector, top_k, search_filter, with_vectors)
             elif mode == "sparse":
                 if not query_text:
                     raise ValueError("query_text required for sparse search")
-                results = self.search_sparse(query_text, top_k, search_filter)
+                results = await self.search_sparse(query_text, top_k, search_filter, with_vectors)
             elif mode == "hybrid":
                 if not query_text:
                     raise ValueError("query_text required for hybrid search")
-                results = self.search_hybrid(query_vector, query_text, top_k, search_filter)
+                results = await self.search_hybrid(
+                    query_vector, query_text, top_k, search_filter, with_vectors
+                )
             else:
                 raise ValueError(f"Invalid search mode: {mode}. Must be 'dense', 'sparse', or 'hybrid'")
 
+            if with_similarity:
+                similarities = _cosine_similarities(
+                    similarity_vector or query_vector,
+                    [hit.vector["dense"] for hit in results]
+                )
+            else:
+                similarities = [None] * len(results)
+
             return [
                 {
                     "id": hit.id,
                     "score": hit.score,
+                    "similarity": similarity,
                     "content": hit.payload.get("content"),
                     "metadata": {k: v for k, v in hit.payload.items() if k != "content"}
                 }
-                for hit in results
+                for hit, similarity in zip(results, similarities)
             ]
         except Exception as e:
             logger.error(f"Search error: {e}")
             raise
     
-    def delete_by_source(self, source_file: str):
+    async def delete_by_source(self, source_file: str):
         """Delete all chunks from a source file"""
+        await self._ensure_collection()
+
         try:
-            self.client.delete(
+            await self.client.delete(
                 collection_name=self.collection_name,
                 points_selector=Filter(
                     must=[
@@ -213,3 +283,8 @@ class VectorStore:
         except Exception as e:
             logger.error(f"Delete error: {e}")
             raise
+
+
+@lru_cache
+def get_vector_store() -> VectorStore:
+    return VectorStore()
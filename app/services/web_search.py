@@ -1,26 +1,39 @@
-from tavily import TavilyClient
 from app.config import get_settings
+from functools import lru_cache
+from app.services.http_client import get_http_client
 from loguru import logger
 
 
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+
+
 class WebSearchService:
     def __init__(self):
         self.settings = get_settings()
-        self.client = TavilyClient(api_key=self.settings.tavily_api_key)
+        # Tavily's REST API is called directly so searches share the
+        # application's HTTP/2 connection pool instead of a per-call client
+        self.client = get_http_client()
+        self.headers = {"Authorization": f"Bearer {self.settings.tavily_api_key}"}
     
-    def search(
+    async def search(
         self,
         query: str,
         max_results: int = 3
     ) -> list[dict]:
         """Search web using Tavily"""
         try:
-            response = self.client.search(
-                query=query,
-                max_results=max_results,
-                search_depth="basic",
-                include_answer=True
+            http_response = await self.client.post(
+                TAVILY_SEARCH_URL,
+                headers=self.headers,
+                json={
+                    "query": query,
+                    "max_results": max_results,
+                    "search_depth": "basic",
+                    "include_answer": True
+                }
             )
+            http_response.raise_for_status()
+            response = http_response.json()
             
             results = []
             for result in response.get('results', []):
@@ -31,9 +44,14 @@ class WebSearchService:
                     "score": result.get('score', 0.0)
                 })
             
-            logger.info(f"Web search returned {len(results)} results")
+            logger.info("Web search returned {} results", len(results))
             return results
             
         except Exception as e:
             logger.error(f"Web search error: {e}")
             return []
+
+
+@lru_cache
+def get_web_search_service() -> WebSearchService:
+    return WebSearchService()
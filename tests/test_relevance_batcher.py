@@ -0,0 +1,144 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+import pytest_asyncio
+
+from app.models import CRAGEvaluation
+from app.services.relevance_batcher import RelevanceBatcher
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_evaluation(score: float = 0.9) -> CRAGEvaluation:
+    return CRAGEvaluation(
+        relevance_score=score,
+        relevance_label="relevant",
+        confidence=0.9,
+        needs_web_search=False,
+        evaluated_at=datetime.now(timezone.utc)
+    )
+
+
+class StubGrader:
+    """Records each batch it is called with and grades every query"""
+
+    def __init__(self, missing: set[str] | None = None, error: Exception | None = None):
+        self.batches: list[list[str]] = []
+        self.missing = missing or set()
+        self.error = error
+
+    async def __call__(self, queries_with_chunks):
+        queries = [query for query, _ in queries_with_chunks]
+        self.batches.append(queries)
+        if self.error is not None:
+            raise self.error
+        return [
+            None if query in self.missing else make_evaluation()
+            for query in queries
+        ]
+
+
+@pytest_asyncio.fixture
+async def make_batcher():
+    """Build batchers that are closed at teardown, so no worker outlives the test"""
+    batchers = []
+
+    def make(grader, **kwargs) -> RelevanceBatcher:
+        batcher = RelevanceBatcher(grader, **kwargs)
+        batchers.append(batcher)
+        return batcher
+
+    yield make
+    for batcher in batchers:
+        await batcher.aclose()
+
+
+async def test_concurrent_requests_within_window_share_one_batch(make_batcher):
+    grader = StubGrader()
+    batcher = make_batcher(grader, max_batch_size=8, window_ms=50)
+
+    results = await asyncio.gather(*(batcher.evaluate(f"q{i}", []) for i in range(3)))
+
+    assert len(results) == 3
+    assert grader.batches == [["q0", "q1", "q2"]]
+
+
+async def test_window_expiry_starts_a_new_batch(make_batcher):
+    grader = StubGrader()
+    batcher = make_batcher(grader, max_batch_size=8, window_ms=10)
+
+    await batcher.evaluate("first", [])
+    await asyncio.sleep(0.03)
+    await batcher.evaluate("second", [])
+
+    assert grader.batches == [["first"], ["second"]]
+
+
+async def test_max_batch_size_cuts_batches(make_batcher):
+    grader = StubGrader()
+    batcher = make_batcher(grader, max_batch_size=3, window_ms=50)
+
+    await asyncio.gather(*(batcher.evaluate(f"q{i}", []) for i in range(5)))
+
+    assert [len(batch) for batch in grader.batches] == [3, 2]
+
+
+async def test_missing_grade_raises_only_for_that_query(make_batcher):
+    grader = StubGrader(missing={"q1"})
+    batcher = make_batcher(grader, max_batch_size=8, window_ms=20)
+
+    results = await asyncio.gather(
+        *(batcher.evaluate(f"q{i}", []) for i in range(3)),
+        return_exceptions=True
+    )
+
+    assert isinstance(results[0], CRAGEvaluation)
+    assert isinstance(results[1], ValueError)
+    assert isinstance(results[2], CRAGEvaluation)
+
+
+async def test_grader_error_fails_the_whole_batch(make_batcher):
+    grader = StubGrader(error=RuntimeError("grader down"))
+    batcher = make_batcher(grader, max_batch_size=8, window_ms=20)
+
+    results = await asyncio.gather(
+        *(batcher.evaluate(f"q{i}", []) for i in range(2)),
+        return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+async def test_worker_restarts_after_it_stops(make_batcher):
+    grader = StubGrader()
+    batcher = make_batcher(grader, max_batch_size=8, window_ms=10)
+
+    await batcher.evaluate("before", [])
+    batcher._worker.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await batcher._worker
+
+    assert isinstance(await batcher.evaluate("after", []), CRAGEvaluation)
+    assert not batcher._worker.done()
+    assert grader.batches == [["before"], ["after"]]
+
+
+async def test_aclose_cancels_pending_evaluations_and_stops_the_worker():
+    release = asyncio.Event()
+
+    async def slow_grader(queries_with_chunks):
+        await release.wait()
+        return [make_evaluation() for _ in queries_with_chunks]
+
+    batcher = RelevanceBatcher(slow_grader, max_batch_size=1, window_ms=10)
+    pending = [asyncio.create_task(batcher.evaluate(f"q{i}", [])) for i in range(3)]
+    await asyncio.sleep(0.02)
+    worker = batcher._worker
+
+    await batcher.aclose()
+
+    results = await asyncio.gather(*pending, return_exceptions=True)
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert worker.done()
+    assert not batcher._in_flight